@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Load test for server mode against a local fake tracker.
+
+Starts a fake GraphQL tracker on localhost and the real parcel service with its API
+server. Then it lets many users add, list, open and refresh the same parcels at once.
+For each phase it records request latency, errors and how many upstream polls the
+tracker saw. With a shared store, N users watching a parcel should cost one poll, not N.
+Nothing touches the network or your parcel data.
+
+    python3 benchmark_api.py --users 50 --parcels 20 --latency-ms 300 --output api.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+STATUSES = ["INFORMATION_RECEIVED", "IN_TRANSIT", "OUT_FOR_DELIVERY", "AVAILABLE_FOR_PICKUP", "DELIVERED"]
+
+
+class FakeTracker:
+    """tracker.delivery stand-in: answers carrier and track queries after a fixed latency, and counts them."""
+
+    def __init__(self, latency_ms, events):
+        self.latency = latency_ms / 1000
+        self.events = events
+        self.carriers = {}
+        self.polls = {}
+        # Numbers answered without tracking information
+        self.missing = set()
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.port = None
+        self.ready = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}/graphql"
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self.ready.wait(5)
+
+    def _run(self):
+        from aiohttp import web
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        app = web.Application()
+        app.router.add_post("/graphql", self._handle)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        self.port = runner.addresses[0][1]
+        self.ready.set()
+        loop.run_forever()
+
+    def total_polls(self):
+        with self.lock:
+            return sum(self.polls.values())
+
+    async def _handle(self, request):
+        from aiohttp import web
+        body = await request.json()
+        variables = body.get("variables") or {}
+        with self.lock:
+            self.requests += 1
+        await asyncio.sleep(self.latency)
+        if "trackingNumber" in variables:
+            number = variables["trackingNumber"]
+            with self.lock:
+                self.polls[number] = self.polls.get(number, 0) + 1
+            return web.json_response({"data": {"track": None if number in self.missing else self.track(number)}})
+        # Carrier catalog and credential probe
+        edges = [{"node": {"id": carrier_id, "name": name}} for name, carrier_id in self.carriers.items()]
+        return web.json_response({"data": {"carriers": {"edges": edges, "pageInfo": {"hasNextPage": False, "endCursor": None}}}})
+
+    def track(self, number):
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=sum(map(ord, number)) % 500)
+        nodes = [{
+            "time": (start + timedelta(hours=6 * index)).isoformat(),
+            "status": {"code": STATUSES[min(index, len(STATUSES) - 2)], "name": None},
+            "description": f"Scan {index} of {number}",
+        } for index in range(self.events)]
+        return {"lastEvent": nodes[-1], "events": {"edges": [{"node": node} for node in nodes]}}
+
+
+def summarize(latencies):
+    if not latencies:
+        return None
+    ordered = sorted(latencies)
+    pick = lambda fraction: round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 1)
+    return {"count": len(ordered), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": round(ordered[-1], 1)}
+
+
+async def run_load(base_url, tokens, parcels, rounds, fake):
+    import aiohttp
+    results = []
+
+    async def call(session, token, method, path, payload=None):
+        started = time.perf_counter()
+        async with session.request(method, base_url + path, json=payload, headers={"Authorization": f"Bearer {token}"}) as response:
+            await response.read()
+            return (time.perf_counter() - started) * 1000, response.status
+
+    async def phase(name, requests):
+        polls_before = fake.total_polls()
+        started = time.perf_counter()
+        timeout = aiohttp.ClientTimeout(total=120)
+        async with aiohttp.ClientSession(timeout=timeout, connector=aiohttp.TCPConnector(limit=0)) as session:
+            outcomes = await asyncio.gather(*(call(session, *request) for request in requests), return_exceptions=True)
+        errors = [str(o) for o in outcomes if isinstance(o, Exception)]
+        done = [o for o in outcomes if not isinstance(o, Exception)]
+        statuses = {}
+        for _, status in done:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        polls = fake.total_polls() - polls_before
+        results.append({
+            "phase": name,
+            "wall_ms": round((time.perf_counter() - started) * 1000, 1),
+            "latency": summarize([latency for latency, _ in done]),
+            "statuses": statuses,
+            "errors": errors[:5],
+            "upstream_polls": polls,
+            "polls_per_parcel": round(polls / len(parcels), 2),
+        })
+        print(f"⏱️ {name}: {len(requests)} requests, {polls} upstream polls", flush=True)
+
+    add = [(token, "POST", "/parcels", {"number": number, "courier": "CJ Logistics", "name": f"{user}'s parcel"})
+           for token, user in tokens.items() for number in parcels]
+    await phase("add", add)
+    await phase("list", [(token, "GET", "/parcels") for token in tokens for _ in range(rounds)])
+    await phase("timeline", [(token, "GET", f"/parcels/{number}") for token in tokens for number in parcels])
+    await phase("refresh", [(token, "POST", "/refresh", {}) for token in tokens for _ in range(rounds)])
+    return results
+
+
+def drive(service, tokens, parcels, rounds, fake):
+    """Runs run_load against the service's API server; returns (phases, error)."""
+    from main import GLib
+    outcome = {}
+    loop = GLib.MainLoop()
+
+    def load():
+        try:
+            outcome["phases"] = asyncio.run(run_load(service.api_server.url, tokens, parcels, rounds, fake))
+        except Exception as e:
+            outcome["error"] = str(e)
+        GLib.idle_add(loop.quit)
+
+    # The service lives on the GLib main loop, the simulated users on their own event loop
+    threading.Thread(target=load, daemon=True).start()
+    loop.run()
+    return outcome.get("phases"), outcome.get("error")
+
+
+def main_entry():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--parcels", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3, help="list and refresh requests per user")
+    parser.add_argument("--events", type=int, default=20, help="events per fake timeline")
+    parser.add_argument("--latency-ms", type=float, default=200, help="fake tracker latency")
+    parser.add_argument("--cache-seconds", type=int, default=0,
+                        help="API_SERVER_CACHE_SECONDS; 0 makes every refresh poll, so only request sharing saves polls")
+    parser.add_argument("--output", default=f"benchmark-api-{datetime.now():%Y%m%d-%H%M%S}.json")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+
+    fake = FakeTracker(args.latency_ms, args.events)
+    fake.start()
+
+    # A throwaway store and configuration, set up before main.py reads them
+    sandbox = tempfile.mkdtemp(prefix="parcelbuddy-api-bench-")
+    tokens = {f"token-{index}": f"user{index}" for index in range(args.users)}
+    os.makedirs(os.path.join(sandbox, "config"))
+    with open(os.path.join(sandbox, "config", "api_tokens.json"), "w") as f:
+        json.dump(tokens, f)
+    os.environ.update({
+        "XDG_DATA_HOME": os.path.join(sandbox, "data"),
+        "XDG_CONFIG_HOME": os.path.join(sandbox, "xdg-config"),
+        "CLIENT_ID": "bench", "CLIENT_SECRET": "bench", "GRAPHQL_URL": fake.url,
+        "API_QUOTA_PER_MINUTE": "", "API_QUOTA_PER_HOUR": "", "API_QUOTA_PER_DAY": "",
+        "API_SERVER_HOST": "127.0.0.1", "API_SERVER_PORT": "0",
+        "API_SERVER_CACHE_SECONDS": str(args.cache_seconds),
+        "DIRECT_CARRIERS": "off", "WEBHOOK_URL": "", "PARCELBUDDY_TRANSPORT": "live", "STALL_THRESHOLD_MS": "0",
+    })
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(sandbox)
+    import main
+    fake.carriers = main.Tracker.CARRIERS
+
+    service = main.ParcelService()
+    service.start_api_server()
+    if service.api_server is None:
+        print("❌ The API server did not start (is aiohttp installed?)")
+        return 1
+    parcels = [f"BENCH{index:06d}" for index in range(args.parcels)]
+    report = {}
+    phases, error = drive(service, tokens, parcels, args.rounds, fake)
+    service.stop()
+    report["phases"] = phases
+    if error:
+        report["error"] = error
+
+    report.update({
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "users": args.users,
+        "parcels": args.parcels,
+        "rounds": args.rounds,
+        "fake_latency_ms": args.latency_ms,
+        "cache_seconds": args.cache_seconds,
+        "upstream_polls": fake.total_polls(),
+        "upstream_requests": fake.requests,
+        "metrics": service.tracker.metrics.counters,
+    })
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {output}")
+    return 1 if "error" in report else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_entry())
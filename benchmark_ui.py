@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Headless scale benchmark for the dashboard and the timeline.
+
+Runs the real ParcelWindow against synthetic histories and timelines and writes
+build time, update time, frame time and resident memory per card to JSON.
+Nothing touches the network or your parcel data: the app runs with a throwaway
+data directory and no credentials.
+
+GTK needs a display, but it doesn't have to be visible. Any of these work:
+
+    GDK_BACKEND=broadway BROADWAY_DISPLAY=:5 python3 benchmark_ui.py   # with gtk4-broadwayd :5 running
+    xvfb-run python3 benchmark_ui.py
+    weston --backend=headless --socket=bench & WAYLAND_DISPLAY=bench python3 benchmark_ui.py
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Isolate the run before main.py reads any configuration or data directory
+SANDBOX = tempfile.mkdtemp(prefix="parcelbuddy-bench-")
+os.environ["XDG_DATA_HOME"] = os.path.join(SANDBOX, "data")
+os.environ["XDG_CONFIG_HOME"] = os.path.join(SANDBOX, "config")
+for key in ("CLIENT_ID", "CLIENT_SECRET", "GRAPHQL_URL", "WEBHOOK_URL", "PARCELBUDDY_PROFILE"):
+    os.environ.pop(key, None)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+ORIGINAL_CWD = os.getcwd()
+os.chdir(SANDBOX)
+
+import main
+from main import Gtk, GLib, Gio, Gdk, TrackEventStatusCode
+
+STATUSES = [TrackEventStatusCode.INFORMATION_RECEIVED, TrackEventStatusCode.IN_TRANSIT, TrackEventStatusCode.OUT_FOR_DELIVERY,
+            TrackEventStatusCode.AVAILABLE_FOR_PICKUP, TrackEventStatusCode.EXCEPTION, TrackEventStatusCode.DELIVERED]
+FRAMES = 60
+SETTLE_TIMEOUT = 120
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def pump(until=None, timeout=SETTLE_TIMEOUT):
+    """Runs the main loop until until() is true, or until nothing is pending when until is None."""
+    context = GLib.MainContext.default()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if until is None:
+            if not context.pending():
+                return True
+            context.iteration(False)
+        else:
+            if until():
+                return True
+            if not context.iteration(False):
+                time.sleep(0.0005)
+    return False
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else None
+
+
+def summarize(values):
+    if not values:
+        return None
+    return {"avg": round(sum(values) / len(values), 3), "p95": round(percentile(values, 0.95), 3), "max": round(max(values), 3)}
+
+
+class FrameMeter:
+    """Paint time and frame interval for the frames a widget's frame clock paints."""
+
+    def __init__(self, widget):
+        self.clock = widget.get_frame_clock()
+        self.paint_started = None
+        self.paints = []
+        self.intervals = []
+        self.last_frame = None
+        self.handlers = [self.clock.connect("before-paint", self._before), self.clock.connect("after-paint", self._after)]
+
+    def _before(self, clock):
+        self.paint_started = time.perf_counter()
+
+    def _after(self, clock):
+        if self.paint_started is None:
+            return
+        now = time.perf_counter()
+        self.paints.append((now - self.paint_started) * 1000)
+        if self.last_frame is not None:
+            self.intervals.append((now - self.last_frame) * 1000)
+        self.last_frame = now
+        self.paint_started = None
+
+    def reset(self):
+        self.paints, self.intervals, self.last_frame = [], [], None
+
+    def close(self):
+        for handler in self.handlers:
+            self.clock.disconnect(handler)
+
+
+def synthetic_history(count):
+    couriers = list(main.Tracker.CARRIER_ICONS)
+    now = datetime.now()
+    history = []
+    for index in range(count):
+        updated = now - timedelta(hours=index % 500)
+        history.append({
+            "name": f"Parcel {index}",
+            "number": f"BENCH{index:06d}",
+            "courier": couriers[index % len(couriers)],
+            "last_status": STATUSES[index % len(STATUSES)],
+            "last_updated_time": updated.strftime("%Y-%m-%d %H:%M:%S"),
+            "days_in_transit": f"{index % 30} days",
+            "fingerprint": None,
+            "first_event_time": None,
+        })
+    return history
+
+
+def synthetic_events(count):
+    start = datetime.now() - timedelta(hours=count)
+    return [{
+        "time": (start + timedelta(hours=index)).strftime("%Y-%m-%d %H:%M:%S"),
+        "status_code": STATUSES[index % (len(STATUSES) - 1)],
+        "status_name": "",
+        "description": f"Scanned at facility {index} — sorting centre, outbound to the next hub",
+    } for index in range(count)]
+
+
+def scroll_frames(win, meter, frames):
+    """Scrolls the dashboard one step per frame so every frame repaints."""
+    adjustment = win.scrolled.get_vadjustment()
+    meter.reset()
+
+    def tick(widget, clock):
+        span = max(adjustment.get_upper() - adjustment.get_page_size(), 1)
+        adjustment.set_value((adjustment.get_value() + adjustment.get_page_size() / 4) % span)
+        return GLib.SOURCE_CONTINUE if len(meter.paints) < frames else GLib.SOURCE_REMOVE
+
+    win.scrolled.add_tick_callback(tick)
+    pump(lambda: len(meter.paints) >= frames)
+
+
+def bench_dashboard(win, meter, count):
+    service = win.service
+    history = synthetic_history(count)
+    service.history = [dict(item) for item in history]
+    win.stack.set_visible_child_name("dashboard")
+    pump()
+    gc.collect()
+    rss_before = rss_bytes()
+
+    started = time.perf_counter()
+    win.load_history()
+    build_ms = (time.perf_counter() - started) * 1000
+    # Deferred work (log lines, incremental sorting) belongs to the build as well
+    settled = pump()
+    settle_ms = (time.perf_counter() - started) * 1000
+    gc.collect()
+    rss_after = rss_bytes()
+
+    # One status change per card, the way refresh results arrive
+    stored = {entry["number"]: entry for entry in service.history}
+    started = time.perf_counter()
+    for item in history:
+        event = {"time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "status_code": TrackEventStatusCode.OUT_FOR_DELIVERY,
+                 "status_name": "", "description": ""}
+        stored[item["number"]].update(last_status=event["status_code"], last_updated_time=event["time"])
+        win.on_parcel_updated(item["name"], item["number"], item["courier"], event, item["days_in_transit"], False)
+    update_ms = (time.perf_counter() - started) * 1000
+    pump()
+
+    scroll_frames(win, meter, FRAMES)
+    return {
+        "parcels": count,
+        "build_ms": round(build_ms, 1),
+        "build_settled_ms": round(settle_ms, 1),
+        "settled": settled,
+        "update_ms_per_card": round(update_ms / count, 3),
+        "paint_ms": summarize(meter.paints),
+        "frame_interval_ms": summarize(meter.intervals),
+        "rss_bytes_per_card": round((rss_after - rss_before) / count),
+        "low_cost_rendering": win.render_mode.enabled,
+    }
+
+
+def bench_timeline(win, meter, count):
+    info = {"last_event": None, "events": synthetic_events(count)}
+    info["last_event"] = info["events"][-1]
+    win.stack.set_visible_child_name("dashboard")
+    pump()
+    meter.reset()
+    started = time.perf_counter()
+    # A number per size, so each run builds its timeline instead of patching the previous one
+    win.show_results("Timeline bench", f"BENCHTIMELINE{count}", "DHL", info)
+    build_ms = (time.perf_counter() - started) * 1000
+    pump(lambda: meter.paints)
+    first_frame_ms = (time.perf_counter() - started) * 1000
+    return {"events": count, "build_ms": round(build_ms, 1), "first_frame_ms": round(first_frame_ms, 1),
+            "paint_ms": round(meter.paints[0], 3) if meter.paints else None}
+
+
+def run(app, args, results):
+    win = app.win
+    if win is None or not win.get_realized():
+        results["error"] = "The window could not be realized; is a display available?"
+        app.quit()
+        return GLib.SOURCE_REMOVE
+    win.set_default_size(1200, 900)
+    pump(lambda: win.get_mapped())
+    meter = FrameMeter(win)
+    display = Gdk.Display.get_default()
+    results["environment"] = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "gtk": f"{Gtk.get_major_version()}.{Gtk.get_minor_version()}.{Gtk.get_micro_version()}",
+        "display": type(display).__name__,
+        "renderer": type(win.get_renderer()).__name__,
+        "gresource": main.Resources.bundled,
+        "flatpak": os.path.exists("/.flatpak-info"),
+    }
+    for count in args.parcels:
+        print(f"📦 Dashboard with {count} parcels...", flush=True)
+        results["dashboard"].append(bench_dashboard(win, meter, count))
+    for count in args.events:
+        print(f"📜 Timeline with {count} events...", flush=True)
+        results["timeline"].append(bench_timeline(win, meter, count))
+    meter.close()
+    app.quit()
+    return GLib.SOURCE_REMOVE
+
+
+def main_entry():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parcels", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--events", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--output", default=f"benchmark-ui-{datetime.now():%Y%m%d-%H%M%S}.json")
+    args = parser.parse_args()
+    # Relative to where the benchmark was started, not the sandbox it runs in
+    output = os.path.join(ORIGINAL_CWD, args.output)
+
+    results = {"dashboard": [], "timeline": []}
+    app = main.ParcelApp(flags=Gio.ApplicationFlags.NON_UNIQUE)
+    # Connected after ParcelApp's own handler, so the window exists by then
+    app.connect("activate", lambda a: GLib.idle_add(run, a, args, results))
+    app.run([sys.argv[0]])
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results written to {output}")
+    return 1 if "error" in results else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_entry())
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Keep GLib's user directories away from real parcel data; GLib caches them on first use
+SANDBOX = tempfile.mkdtemp(prefix="parcelbuddy-tests-")
+os.environ["XDG_DATA_HOME"] = os.path.join(SANDBOX, "data")
+os.environ["XDG_CONFIG_HOME"] = os.path.join(SANDBOX, "config")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
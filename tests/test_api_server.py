@@ -0,0 +1,89 @@
+import json
+
+import pytest
+import requests
+
+pytest.importorskip("gi")
+pytest.importorskip("aiohttp")
+
+import main
+from benchmark_api import FakeTracker, drive
+
+USERS = 5
+PARCELS = 3
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    fake = FakeTracker(latency_ms=100, events=5)
+    fake.start()
+    fake.carriers = main.Tracker.CARRIERS
+
+    tokens_file = tmp_path / "api_tokens.json"
+    tokens = {f"token-{index}": f"user{index}" for index in range(USERS)}
+    tokens_file.write_text(json.dumps(tokens))
+    for key, value in {"CLIENT_ID": "test", "CLIENT_SECRET": "test", "GRAPHQL_URL": fake.url}.items():
+        monkeypatch.setenv(key, value)
+        monkeypatch.setattr(main.Tracker, key, value)
+    monkeypatch.setattr(main.Tracker, "API_QUOTAS", {"minute": None, "hour": None, "day": None})
+    monkeypatch.setattr(main.Tracker, "DIRECT_CARRIERS", "off")
+    monkeypatch.setattr(main.Tracker, "TRANSPORT", "live")
+    monkeypatch.setattr(main.StallWatchdog, "THRESHOLD_MS", 0)
+    monkeypatch.setattr(main.ParcelService, "WEBHOOK_URL", "")
+    monkeypatch.setattr(main.ParcelService, "API_SERVER_HOST", "127.0.0.1")
+    monkeypatch.setattr(main.ParcelService, "API_SERVER_PORT", "0")
+    # Every refresh polls, so only request sharing keeps the polls down
+    monkeypatch.setattr(main.ApiServer, "CACHE_SECONDS", 0)
+    monkeypatch.setattr(main, "api_tokens_file", str(tokens_file))
+
+    service = main.ParcelService()
+    service.start_api_server()
+    assert service.api_server is not None
+    yield service, tokens, fake
+    service.stop()
+
+
+def test_users_share_one_poll_per_parcel(service):
+    service, tokens, fake = service
+    parcels = [f"TEST{index:06d}" for index in range(PARCELS)]
+    phases, error = drive(service, tokens, parcels, 1, fake)
+    assert error is None
+    phases = {phase["phase"]: phase for phase in phases}
+
+    for phase in phases.values():
+        assert phase["errors"] == []
+        assert not any(int(status) >= 500 for status in phase["statuses"]), phase
+    assert set(phases["list"]["statuses"]) == {"200"}
+    # Concurrent lookups of a parcel join one request instead of polling once per user
+    for name in ("add", "timeline", "refresh"):
+        assert phases[name]["polls_per_parcel"] <= 1.5, phases[name]
+    assert fake.requests < USERS * PARCELS
+
+
+def add(service, tokens, body):
+    token = next(iter(tokens))
+    return requests.post(f"{service.api_server.url}/parcels", json=body, headers={"Authorization": f"Bearer {token}"}, timeout=10)
+
+
+@pytest.mark.parametrize("body", [["TEST000001"], "TEST000001", 42])
+def test_add_rejects_non_object_body(service, body):
+    service, tokens, fake = service
+    assert add(service, tokens, body).status_code == 400
+    assert fake.total_polls() == 0
+
+
+def test_add_rejects_bad_check_digit_offline(service):
+    service, tokens, fake = service
+    # 1Z999AA10123456784 is valid; the last digit is off by one
+    response = add(service, tokens, {"number": "1Z999AA10123456785", "courier": "UPS"})
+    assert response.status_code == 400
+    assert "check digit" in response.json()["error"]
+    assert fake.total_polls() == 0
+
+
+def test_unknown_number_is_not_found(service):
+    service, tokens, fake = service
+    fake.missing.add("TEST404404")
+    response = add(service, tokens, {"number": "TEST404404", "courier": "CJ Logistics"})
+    assert response.status_code == 404
+    assert "No tracking information" in response.json()["error"]
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+# main.py needs GTK's introspection bindings
+pytest.importorskip("gi")
+
+import main
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(main.StallWatchdog, "THRESHOLD_MS", 0)
+    service = main.ParcelService()
+    service.data_file = str(tmp_path / "history.json")
+    service.archive = main.ParcelArchive(str(tmp_path / "archive"), service.log_message)
+    service.save_history([])
+    yield service
+    service.stop()
+
+
+def delivered(number, days_ago):
+    when = (datetime.now() - timedelta(days=days_ago)).isoformat(timespec="seconds")
+    return {"name": number, "number": number, "courier": "UPS", "last_status": main.TrackEventStatusCode.DELIVERED, "last_updated_time": when}
+
+
+def numbers(service):
+    return [item["number"] for item in service.history]
+
+
+def test_old_delivered_parcels_are_archived(service):
+    service.save_history([delivered("OLD", 30), delivered("NEW", 1)])
+    service.compact_history()
+    assert numbers(service) == ["NEW"]
+    assert len(service.archive) == 1
+
+
+def test_restored_parcel_stays_active(service):
+    service.save_history([delivered("OLD", 30)])
+    service.compact_history()
+    service.archive.load()
+
+    assert service.restore_from_archive("OLD")["number"] == "OLD"
+    service.compact_history()
+    assert numbers(service) == ["OLD"]
+    assert len(service.archive) == 0
+
+    # A refresh keeps the marker, so the next cycle doesn't archive it either
+    item = service.stored_parcel("OLD")
+    service.add_to_history("OLD", "OLD", "UPS", item["last_status"], item["last_updated_time"], "N/A")
+    service.compact_history()
+    assert numbers(service) == ["OLD"]
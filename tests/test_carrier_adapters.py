@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+pytest.importorskip("gi")
+pytest.importorskip("bs4")
+
+from main import AdapterError, CarrierAdapter, JapanPostAdapter, KoreaPostAdapter, TrackEventStatusCode
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "adapters")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_korea_post_timeline():
+    events = KoreaPostAdapter().parse(fixture("korea_post_delivered.html"), "6892035123456")
+    assert [(e["time"], e["status_code"], e["description"]) for e in events] == [
+        ("2024-05-01 17:42:00", TrackEventStatusCode.AT_PICKUP, "접수 — 서울강남"),
+        ("2024-05-01 23:05:00", TrackEventStatusCode.IN_TRANSIT, "발송 — 동서울우편집중국"),
+        ("2024-05-02 04:18:00", TrackEventStatusCode.IN_TRANSIT, "도착 — 부산우편집중국"),
+        ("2024-05-03 08:51:00", TrackEventStatusCode.OUT_FOR_DELIVERY, "배달준비 (집배원: 박*호) — 부산해운대"),
+        ("2024-05-03 14:27:00", TrackEventStatusCode.DELIVERED, "배달완료 (수령인: 본인) — 부산해운대"),
+    ]
+    assert events[-1]["status_name"] == TrackEventStatusCode.get_pretty_name(TrackEventStatusCode.DELIVERED)
+
+
+def test_korea_post_unknown_number():
+    assert KoreaPostAdapter().parse(fixture("korea_post_unknown.html"), "0000000000000") == []
+
+
+def test_japan_post_timeline():
+    events = JapanPostAdapter().parse(fixture("japan_post_delivered.html"), "123456789012")
+    assert [(e["time"], e["status_code"], e["description"]) for e in events] == [
+        ("2024-05-01 10:12:00", TrackEventStatusCode.AT_PICKUP, "Posting/Collection — Shinjuku Post Office, Tokyo"),
+        ("2024-05-01 21:40:00", TrackEventStatusCode.IN_TRANSIT, "En route — Shin-Tokyo Post Office, Tokyo"),
+        ("2024-05-02 09:05:00", TrackEventStatusCode.OUT_FOR_DELIVERY, "Out for delivery — Osaka-Kita Post Office, Osaka"),
+        ("2024-05-02 13:30:00", TrackEventStatusCode.ATTEMPT_FAIL, "Notice of attempted delivery — Osaka-Kita Post Office, Osaka"),
+        ("2024-05-03 11:02:00", TrackEventStatusCode.DELIVERED, "Final delivery — Osaka-Kita Post Office, Osaka"),
+    ]
+
+
+def test_japan_post_unknown_number():
+    assert JapanPostAdapter().parse(fixture("japan_post_unknown.html"), "999999999999") == []
+
+
+@pytest.mark.parametrize("adapter", [KoreaPostAdapter, JapanPostAdapter])
+def test_page_that_is_not_a_tracking_page(adapter):
+    with pytest.raises(AdapterError):
+        adapter().parse(fixture("maintenance.html"), "123456789012")
+
+
+def test_korea_post_unexpected_date():
+    page = fixture("korea_post_delivered.html").replace("2024.05.02", "02/05/2024")
+    with pytest.raises(AdapterError):
+        KoreaPostAdapter().parse(page, "6892035123456")
+
+
+def test_plugins_register_and_are_logged(tmp_path):
+    (tmp_path / "example.py").write_text(
+        "class ExampleAdapter(CarrierAdapter):\n"
+        "    CARRIER_ID = 'test.example'\n"
+    )
+    (tmp_path / "broken.py").write_text("raise RuntimeError('boom')\n")
+    messages = []
+    try:
+        CarrierAdapter.load_plugins(str(tmp_path), messages.append)
+        assert "test.example" in CarrierAdapter.registry
+    finally:
+        CarrierAdapter.registry.pop("test.example", None)
+    assert any("broken.py" in message and "boom" in message for message in messages)
+    assert any("example.py" in message and "test.example" in message for message in messages)
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+# main.py needs GTK's introspection bindings
+pytest.importorskip("gi")
+requests = pytest.importorskip("requests")
+
+import main
+
+CARRIER_ID = "kr.cjlogistics"
+
+
+def response(status, payload):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(payload).encode()
+    return response
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    tracker = main.Tracker(lambda message: None)
+    monkeypatch.setattr(tracker, "get_carrier_ids", lambda interactive=False: {"CJ Logistics": CARRIER_ID})
+    return tracker
+
+
+def lookup(tracker, answer):
+    tracker._post = lambda *args, **kwargs: answer
+    with pytest.raises(Exception):
+        tracker._track_aggregator("123456789012", "CJ Logistics", False, "dashboard", None)
+
+
+def test_endpoint_errors_leave_the_carrier_closed(tracker):
+    for _ in range(main.CarrierHealth.FAILURE_THRESHOLD + 1):
+        lookup(tracker, response(502, {}))
+    health = tracker.health_for(CARRIER_ID)
+    assert health.state == main.CarrierHealth.CLOSED
+    assert health.consecutive_failures == 0
+
+
+def test_carrier_errors_open_the_circuit(tracker):
+    payload = {"data": {"track": None}, "errors": [{"message": f"Upstream {CARRIER_ID} is not responding", "extensions": {"code": "INTERNAL"}}]}
+    for _ in range(main.CarrierHealth.FAILURE_THRESHOLD):
+        lookup(tracker, response(200, payload))
+    assert tracker.health_for(CARRIER_ID).state == main.CarrierHealth.OPEN
+
+
+def test_carrier_error_needs_the_carrier_named():
+    assert main.Tracker._carrier_error(response(500, {"errors": [{"message": "Internal error"}]}), CARRIER_ID) is None
+    assert main.Tracker._carrier_error(response(200, {"errors": [{"message": "failed", "extensions": {"carrierId": CARRIER_ID}}]}), CARRIER_ID) == "failed"
@@ -0,0 +1,72 @@
+import pytest
+
+# main.py needs GTK's introspection bindings
+pytest.importorskip("gi")
+
+from main import CarrierRecognizer
+
+# (carrier, number with a correct check digit), one per check-digit rule
+VALID = [
+    ("UPS", "1Z999AA10123456784"),  # 1Z mod 10
+    ("Korea Post", "RR123456785KR"),  # UPU S10
+    ("USPS", "RR123456785US"),  # UPU S10
+    ("Yuubin", "RR123456785JP"),  # UPU S10
+    ("Korea Post EMS", "EE123456785KR"),  # UPU S10
+    ("USPS", "9400111899223100000000"),  # GS1 mod 10
+    ("DHL", "00340434161094042557"),  # GS1 mod 10
+    ("Fedex", "123456789012343"),  # GS1 mod 10
+    ("Fedex", "9612019000000000000000"),  # FedEx Ground 96
+    ("Fedex", "987654321010"),  # FedEx Express
+    ("DHL", "1234567891"),  # mod 7
+    ("Logen", "12345678903"),  # mod 7
+    ("CJ Logistics", "123456789013"),  # mod 7
+]
+
+
+def off_by_one(number):
+    """The same number with its check digit (the last digit) one higher."""
+    i = max(i for i, ch in enumerate(number) if ch.isdigit())
+    return number[:i] + str((int(number[i]) + 1) % 10) + number[i + 1:]
+
+
+@pytest.mark.parametrize("carrier,number", VALID)
+def test_valid_number_is_recognized(carrier, number):
+    assert CarrierRecognizer.problem(number, carrier) is None
+    assert carrier in dict(CarrierRecognizer.rank(number))
+
+
+@pytest.mark.parametrize("carrier,number", VALID)
+def test_one_digit_off_is_rejected(carrier, number):
+    typo = off_by_one(number)
+    assert CarrierRecognizer.problem(typo, carrier) is not None
+    assert carrier not in dict(CarrierRecognizer.rank(typo))
+
+
+def test_formatting_is_ignored():
+    assert CarrierRecognizer.rank("1z 999 aa1 0123 4567 84") == CarrierRecognizer.rank("1Z999AA10123456784")
+
+
+def test_unknown_format_has_no_problem():
+    assert CarrierRecognizer.rank("ABC") == []
+    assert CarrierRecognizer.problem("ABC", "UPS") is None
+
+
+@pytest.mark.parametrize(
+    "number,expected",
+    [
+        # EMS items from Korea fit the generic EMS, Korea Post and Korea Post EMS rules
+        ("EE123456785KR", ["Korea Post EMS", "Korea Post", "EMS"]),
+        # SSCC labels also fit the generic 20-digit USPS rule
+        ("00340434161094042557", ["DHL", "USPS"]),
+        # 12 digits that pass both FedEx Express and mod 7 fit every 12-digit carrier
+        ("987654321010", ["Fedex", "CJ Logistics", "Lotte", "Yamato", "Sagawa", "Hanjin"]),
+        # A failed check drops the carrier instead of ranking it lower
+        ("1234567891", ["DHL", "Hanjin"]),
+        ("1234567890", ["Hanjin"]),
+    ],
+)
+def test_rank_orders_ambiguous_numbers(number, expected):
+    ranked = CarrierRecognizer.rank(number)
+    assert [carrier for carrier, _ in ranked] == expected
+    confidences = [confidence for _, confidence in ranked]
+    assert confidences == sorted(confidences, reverse=True)
@@ -0,0 +1,31 @@
+import tracemalloc
+
+import pytest
+
+# main.py needs GTK's introspection bindings
+pytest.importorskip("gi")
+
+from main import Metrics, Profiler
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = Profiler(lambda message: None, Metrics())
+    profiler.bundle_dir = str(tmp_path)
+    yield profiler
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def test_capture_stops_the_tracing_it_started(profiler):
+    profiler.start()
+    assert tracemalloc.is_tracing()
+    assert profiler.stop()
+    assert not tracemalloc.is_tracing()
+
+
+def test_capture_leaves_existing_tracing_running(profiler):
+    tracemalloc.start()
+    profiler.start()
+    assert profiler.stop()
+    assert tracemalloc.is_tracing()
@@ -0,0 +1,56 @@
+import pytest
+import requests
+
+# main.py needs GTK's introspection bindings
+pytest.importorskip("gi")
+
+from main import WebhookReceiver
+
+SECRET = "s3cret"
+
+
+@pytest.fixture
+def receiver():
+    received = []
+    receiver = WebhookReceiver("127.0.0.1", 0, SECRET, lambda carrier_id, number: received.append((carrier_id, number)))
+    receiver.received = received
+    receiver.start()
+    yield receiver
+    receiver.stop()
+
+
+def post(receiver, params=None, payload=None):
+    payload = payload or {"carrierId": "kr.cjlogistics", "trackingNumber": "123456789012"}
+    return requests.post(receiver.local_url, params=params, json=payload, timeout=5)
+
+
+def test_signed_callback_is_accepted(receiver):
+    response = post(receiver, params={"token": SECRET})
+    assert response.status_code == 202
+    assert receiver.received == [("kr.cjlogistics", "123456789012")]
+    assert receiver.callbacks_received == 1
+
+
+def test_unsigned_callback_is_rejected(receiver):
+    assert post(receiver).status_code == 403
+    assert post(receiver, params={"token": "wrong"}).status_code == 403
+    assert post(receiver, params={"token": "s3crët"}).status_code == 403
+    assert receiver.received == []
+    assert receiver.callbacks_received == 0
+
+
+def test_callback_without_tracking_number_is_rejected(receiver):
+    response = post(receiver, params={"token": SECRET}, payload={"carrierId": "kr.cjlogistics"})
+    assert response.status_code == 400
+    assert receiver.received == []
+
+
+def test_without_secret_any_callback_is_accepted():
+    received = []
+    receiver = WebhookReceiver("127.0.0.1", 0, "", lambda carrier_id, number: received.append(number))
+    receiver.start()
+    try:
+        assert post(receiver).status_code == 202
+    finally:
+        receiver.stop()
+    assert received == ["123456789012"]